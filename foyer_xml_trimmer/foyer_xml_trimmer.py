@@ -15,18 +15,49 @@ import foyer
 
 from foyer import Forcefield
 
-import xml.etree.ElementTree as ET
-from xml.etree.ElementTree import Element,tostring, ElementTree
+# lxml provides a C-backed parser that mirrors the ElementTree API,
+# giving much faster parsing of large force field files.
+# Fall back to the stdlib parser if lxml is not installed.
+try:
+    from lxml import etree as ET
+    from lxml.etree import Element, tostring, ElementTree
+    _HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    from xml.etree.ElementTree import Element, tostring, ElementTree
+    _HAVE_LXML = False
 from pkg_resources import resource_filename
+from collections import deque
+from functools import lru_cache
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+
+# Once atom-type names are mapped to small integer ids, deduplicating the
+# topology collections is a vectorized numpy operation and the innermost
+# matching loop in _topology_match is pure integer comparison, which numba
+# can compile to machine code. Both packages are optional; without them we
+# fall back to the pure python loops.
+try:
+    import numpy as np
+    _HAVE_NUMPY = True
+except ImportError:
+    _HAVE_NUMPY = False
+
+try:
+    from numba import njit
+    _HAVE_NUMBA = _HAVE_NUMPY
+except ImportError:
+    _HAVE_NUMBA = False
 
 # returns an XML Element for a user defined tag (str)
 # with attributes that are defined in temp_dict (dictionary)
 def _dict_to_xml(tag, temp_dict):
- 
-    elem = Element(tag)
-    elem.attrib = temp_dict
-         
-    return elem
+
+    # hand the mapping straight to the constructor rather than creating an
+    # empty element and filling its attrib afterwards; this works the same
+    # under lxml and the stdlib, and the constructor copies the mapping so
+    # the source element's attributes are never shared with the output tree
+    return Element(tag, attrib=temp_dict)
 
 # topological parameters sets can be defined for a collection of atoms by class,
 # e.g., class1, class2, class3, class4 (for a dihedral)
@@ -39,132 +70,328 @@ def _dict_to_xml(tag, temp_dict):
 # i.e., each time we encounter class we update the weight by 1
 # and most specific have the lowest weight value, i.e., they add 0 to the running weight.
 def _identify_schema(attrib_dict, nparams=2):
+    # the schema depends only on which class{i}/type{i} keys are present,
+    # and a force field only uses a handful of distinct combinations across
+    # hundreds of entries, so the actual work is cached per unique key set
+    key = frozenset(k for k in attrib_dict if k.startswith(('class', 'type')))
+    return _schema_for_key(key, nparams)
+
+@lru_cache(maxsize=None)
+def _schema_for_key(attrib_keys, nparams=2):
     schema = []
     weight = 0
     for i in range(1, nparams+1):
-        if f'class{i}' in attrib_dict:
+        if f'class{i}' in attrib_keys:
             schema.append(f'class{i}')
             weight +=1
         else:
             schema.append(f'type{i}')
-    
-    return schema, weight
 
-# simple helper function that will return the class type if class appears in the schema
-# otherwise the atom_type is returned
-def _switch_class_type(schema, atom_class, atom_type):
-    if 'class' in schema:
-        return atom_class
+    return tuple(schema), weight
+
+# Serialize the populated output tree. With lxml we stream the file through
+# etree.xmlfile, opening each section and writing its entries one element at
+# a time; this skips the whole-tree indent pass and keeps the serializer's
+# working set to a single element. The stdlib fallback pretty-prints and
+# writes the full tree in one shot.
+def _write_forcefield(blank_tree, output_xml):
+    blank_root = blank_tree.getroot()
+    if _HAVE_LXML:
+        with ET.xmlfile(output_xml, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element(blank_root.tag, attrib=blank_root.attrib):
+                for section in blank_root:
+                    with xf.element(section.tag, attrib=section.attrib):
+                        for entry in section:
+                            xf.write(entry)
     else:
-        return atom_type
-
-
-# Function that will search the XML data for the equivalent topological collection and write the parameters to
-# the new xml file output.
-def _topology_match(atom_type_dict, typed_topo, xml_root, blank_root, topo_type, n_params):
-
-        #define a dictionary where the val corresponds to the right section in the output xml
-        xml_section = {
-                        'Bond': 'HarmonicBondForce',
-                        'Angle':'HarmonicAngleForce',
-                        'Proper': 'RBTorsionForce',
-                        'Improper': 'PeriodicTorsionForce'
-                    }
-        #define a dictionary that will point us to the correct name in parmed data structure
-        parmed_section = {
-                        'Bond': 'bonds',
-                        'Angle':'angles',
-                        'Proper': 'rb_torsions',
-                        'Improper': 'impropers'
-                    }
-        #definition of equivalent sequences for parameter matching
-        #bond/angle/proper all follows simple forward/reverse schemes,
-        #impropers are defined about a center atom, which appears first in the list,
-        #and thus any order of the other 3 atoms is equivalent
-        sequences = {
-                        'Bond': [[0,1], [1,0]],
-                        'Angle': [[0,1,2],[2,1,0]],
-                        'Proper': [[0,1,2,3], [3,2,1,0]],
-                        'Improper': [ [0,1,2,3], [0,1,3,2], [0,2,1,3], [0,2,3,1], [0,3,1,2], [0,3,2,1]],
-        
-                    }
-        topo_by_type = []
+        ET.indent(blank_root, space='\t', level=0)
+        blank_tree.write(output_xml, encoding="utf-8", xml_declaration=True)
 
-        # rather than using a lot of if/else statements, just use eval to get us
-        # into the appropriate part of the parmed data structure.
-        topo_temp = eval(f'typed_topo.{parmed_section[topo_type]}')
-        for topo_element in topo_temp:
-            
-            # use eval again rather than lots of if/else statements
-            topo_af = []
-            for i in range(0,n_params):
-                topo_af.append(eval(f'topo_element.atom{i+1}.type'))
-            
-            # We don't want to include duplicates, including equivalent sequences.
-            # We will check if this collection of atom_types or equivalent sequences
-            # already have been added to in the topo_type array
-            unique = True
-            for seq in sequences[topo_type]:
-                if [topo_af[i] for i in seq] in topo_by_type:
-                    unique = False
+# Resolve the atom-class for every atom_type in the system and pull in any
+# atom_types referenced by an overrides statement. xml_type_attribs maps an
+# atom_type name to its attributes from the xml file. A worklist means each
+# atom_type is processed exactly once; a chain of overrides just appends the
+# new names to the queue rather than forcing another full sweep.
+def _resolve_overrides(atom_type_dict, xml_type_attribs):
+    queue = deque(atom_type_dict)
+    while queue:
+        atom_type = queue.popleft()
+        #find the matching atom_type in the xml file
+        attrib = xml_type_attribs.get(atom_type)
+        if attrib is None:
+            continue
+        #associated the atom-class with atom-type
+        atom_type_dict[atom_type] = attrib['class']
+        if 'overrides' in attrib:
+            for override in attrib['overrides'].split(','):
+                if override not in atom_type_dict:
+                    atom_type_dict[override] = ''
+                    queue.append(override)
+                    print('Note: atom type: ', override, ' is referenced in an overrides statement, but does not appear in the system.')
+
+# returns the canonical form of a topological collection, i.e., the
+# lexicographically smallest tuple among all of its equivalent orderings.
+# This gives us a hashable key so duplicate detection can be done with a set
+# rather than scanning a list of every collection seen so far.
+def _canonical(topo_af, sequences):
+    return min(tuple(topo_af[i] for i in seq) for seq in sequences)
+
+if _HAVE_NUMBA:
+    # integer match kernel: for each topology row, return the index of the
+    # first xml entry it matches under any equivalent sequence (entries are
+    # pre-sorted most specific first), or -1 if no entry matches.
+    # topo_arr holds atom-type ids, class_id maps a type id to its class id,
+    # and required_arr holds the entry values encoded in the matching id
+    # space (type or class, per use_class_arr), with -1 for values that do
+    # not appear in the system and so can never match.
+    @njit(cache=True)
+    def _match_kernel(topo_arr, required_arr, use_class_arr, sequences_arr, class_id):
+        n_topo = topo_arr.shape[0]
+        n_entries = required_arr.shape[0]
+        n_seq = sequences_arr.shape[0]
+        n_params = topo_arr.shape[1]
+        matched = np.full(n_topo, -1, dtype=np.int64)
+        for t in range(n_topo):
+            for e in range(n_entries):
+                for s in range(n_seq):
+                    ok = True
+                    for i in range(n_params):
+                        type_id = topo_arr[t, sequences_arr[s, i]]
+                        if use_class_arr[e, i]:
+                            got = class_id[type_id]
+                        else:
+                            got = type_id
+                        if got != required_arr[e, i]:
+                            ok = False
+                            break
+                    if ok:
+                        matched[t] = e
+                        break
+                if matched[t] >= 0:
                     break
-            if unique:
-                topo_by_type.append(topo_af)
+        return matched
+
+
+# constant tables used by _topology_match, hoisted to module scope so they
+# are built once rather than on every call. Tuples rather than lists so
+# they are immutable and slightly cheaper to iterate.
+#
+#_XML_SECTION maps a topo_type to the right section in the output xml
+_XML_SECTION = {
+                'Bond': 'HarmonicBondForce',
+                'Angle':'HarmonicAngleForce',
+                'Proper': 'RBTorsionForce',
+                'Improper': 'PeriodicTorsionForce'
+            }
+#_PARMED_SECTION points us to the correct name in the parmed data structure
+_PARMED_SECTION = {
+                'Bond': 'bonds',
+                'Angle':'angles',
+                'Proper': 'rb_torsions',
+                'Improper': 'impropers'
+            }
+#definition of equivalent sequences for parameter matching
+#bond/angle/proper all follows simple forward/reverse schemes,
+#impropers are defined about a center atom, which appears first in the list,
+#and thus any order of the other 3 atoms is equivalent
+_SEQUENCES = {
+                'Bond': ((0,1), (1,0)),
+                'Angle': ((0,1,2), (2,1,0)),
+                'Proper': ((0,1,2,3), (3,2,1,0)),
+                'Improper': ((0,1,2,3), (0,1,3,2), (0,2,1,3), (0,2,3,1), (0,3,1,2), (0,3,2,1)),
+            }
+#the topology kinds we process, with the number of atoms in each collection
+_TOPO_TYPES = (('Bond', 2), ('Angle', 3), ('Proper', 4), ('Improper', 4))
+
+
+# Walk the parmed data structure once for a given topology kind and return
+# the atom-type collections with duplicates removed. We don't want to
+# include duplicates, including equivalent sequences; the canonical tuple
+# is the same for all equivalent orderings of a collection, so a single set
+# lookup covers every sequence at once.
+def _collect_unique_topology(typed_molecule, topo_type, n_params):
+    seqs = _SEQUENCES[topo_type]
+    # rather than using a lot of if/else statements, just use getattr to get us
+    # into the appropriate part of the parmed data structure.
+    # getattr avoids recompiling an expression per access the way eval does.
+    topo_temp = getattr(typed_molecule, _PARMED_SECTION[topo_type])
+    atom_attrs = [f'atom{i+1}' for i in range(n_params)]
+
+    topo_names = [tuple(getattr(topo_element, attr).type for attr in atom_attrs)
+                  for topo_element in topo_temp]
+
+    if _HAVE_NUMPY and topo_names:
+        # integerize the atom-type names and push the canonicalization and
+        # the row-wise dedup down to numpy
+        name_to_id = {}
+        for topo_af in topo_names:
+            for name in topo_af:
+                if name not in name_to_id:
+                    name_to_id[name] = len(name_to_id)
+        arr = np.array([[name_to_id[name] for name in topo_af] for topo_af in topo_names],
+                       dtype=np.int32)
+        if topo_type == 'Improper':
+            # the center atom is fixed; any ordering of the other three is
+            # equivalent, so sorting them gives the canonical row
+            canon = np.hstack((arr[:, :1], np.sort(arr[:, 1:], axis=1)))
+        else:
+            # forward/reverse equivalence: take whichever of the two
+            # orderings sorts first, compared column by column
+            rev = arr[:, ::-1]
+            take_rev = np.zeros(len(arr), dtype=bool)
+            undecided = np.ones(len(arr), dtype=bool)
+            for i in range(n_params):
+                take_rev |= undecided & (rev[:, i] < arr[:, i])
+                undecided &= rev[:, i] == arr[:, i]
+            canon = np.where(take_rev[:, None], rev, arr)
+        # keep the first occurrence of each canonical row, in input order
+        _, first = np.unique(canon, axis=0, return_index=True)
+        return [topo_names[i] for i in sorted(first)]
+
+    unique_topos = []
+    seen = set()
+    for topo_af in topo_names:
+        canon = _canonical(topo_af, seqs)
+        if canon not in seen:
+            seen.add(canon)
+            unique_topos.append(topo_af)
+
+    return unique_topos
+
+
+# Build the matcher for one topology kind. Each matcher searches the XML data for the
+# equivalent topological collection and returns the matched parameter elements for the
+# new xml file output. Returning the elements rather than appending them keeps the
+# matchers free of shared mutable state, so the four topology kinds can be matched
+# concurrently. The kind's tag, atom count, and sequence table are captured as closure
+# locals, so the matchers do no per-call dict dispatch on topo_type and every loop
+# shape is fixed when the closure is created.
+def _make_matcher(topo_type, n_params):
+
+    seqs = _SEQUENCES[topo_type]
+
+    def _matcher(atom_type_dict, unique_topos, xml_root):
+
+        topo_by_type = unique_topos
+        matched_elems = []
+
+        # intern the canonical tuples so every occurrence of the same key is
+        # the same object; set and dict lookups then succeed on the identity
+        # fast-path without comparing the tuples element by element
+        _interned = {}
+        def _intern(key):
+            return _interned.setdefault(key, key)
         
         # entries can be defined using class, atom_type, or a combination of both
         # this code will examine each entry in the xml file and identifies the schema
         # that way we make the right comparison later
-        topo_entry_temp = []
-        for topo in xml_root.iter(topo_type):
+        # weights are bounded by n_params, so bucketing by weight and
+        # chaining the buckets orders the entries in O(N) with no
+        # per-comparison key lambda
+        buckets = [[] for _ in range(n_params + 1)]
+        for topo in xml_root.findall(f'.//{topo_type}'):
             schema, weight = _identify_schema(topo.attrib, n_params)
-            topo_dict = {'schema': schema, 'weight': weight, 'attrib': topo.attrib}
-            topo_entry_temp.append(topo_dict)
-        
-        # sort the list such that the most specific entries will be checked first.
-        # Weights are assigned such that the least specific have the highest value
-        # so we can sort from lowest to highest.
-        topo_entries = sorted(topo_entry_temp, key=lambda d: d['weight'])
-        
-        unique_collection = []
+            # precompute the values this entry requires at each position and
+            # whether each position is matched by class or by atom_type;
+            # these are constant per entry, so the hot loop below reduces
+            # to a single tuple comparison
+            topo_dict = {'schema': schema, 'weight': weight, 'attrib': topo.attrib,
+                         'required': tuple(topo.attrib[s] for s in schema),
+                         'use_class': tuple(s.startswith('class') for s in schema)}
+            buckets[weight].append(topo_dict)
+
+        # the most specific entries are checked first. Weights are assigned
+        # such that the least specific have the highest value, so we walk
+        # the buckets from lowest to highest.
+        topo_entries = list(chain.from_iterable(buckets))
         
+        unique_collection = set()
+
+        if _HAVE_NUMBA and topo_by_type and topo_entries:
+            # encode the atom types, classes, entry requirements, and
+            # sequences as int arrays and let the jitted kernel find the
+            # first matching entry for every topology element in one call
+            name_to_id = {name: i for i, name in enumerate(atom_type_dict)}
+            class_to_id = {}
+            for atom_class in atom_type_dict.values():
+                if atom_class not in class_to_id:
+                    class_to_id[atom_class] = len(class_to_id)
+            class_id = np.array([class_to_id[atom_type_dict[name]] for name in name_to_id], dtype=np.int32)
+            topo_arr = np.array([[name_to_id[t] for t in topo_af] for topo_af in topo_by_type], dtype=np.int32)
+            sequences_arr = np.array(seqs, dtype=np.int32)
+            required_arr = np.array([[(class_to_id if uc else name_to_id).get(val, -1)
+                                      for val, uc in zip(entry['required'], entry['use_class'])]
+                                     for entry in topo_entries], dtype=np.int32)
+            use_class_arr = np.array([entry['use_class'] for entry in topo_entries], dtype=np.bool_)
+
+            for entry_index in _match_kernel(topo_arr, required_arr, use_class_arr, sequences_arr, class_id):
+                if entry_index < 0:
+                    continue
+                topo_entry = topo_entries[entry_index]
+                collection_key = _intern(_canonical(topo_entry['required'], seqs))
+                if collection_key not in unique_collection:
+                    unique_collection.add(collection_key)
+                    matched_elems.append(_dict_to_xml(topo_type, topo_entry['attrib']))
+            return matched_elems
+
         for topo_element in topo_by_type:
+            # the class of each atom depends only on the element, so look
+            # the classes up once here instead of per entry/sequence/position
+            element_classes = tuple(atom_type_dict[t] for t in topo_element)
             not_matched = True
             for topo_entry in topo_entries:
-                schema = topo_entry['schema']
+                required = topo_entry['required']
+                use_class = topo_entry['use_class']
                 topo = topo_entry['attrib']
 
-                for sequence in sequences[topo_type]:
-                    match = []
-                    collection = []
-                    
+                for sequence in seqs:
+
                     if not_matched:
-                        seq_test = [topo_element[i] for i in sequence]
-                        for i,seq in enumerate(seq_test):
-                            match.append(False)
-                            if topo[schema[i]] == _switch_class_type(schema[i], atom_type_dict[seq] ,seq):
-                                match[i] = True
-                            collection.append(topo[schema[i]])
-                                
-                        if all(match):
-                            if collection not in unique_collection:
-                                unique_collection.append(collection)
-                                elem = _dict_to_xml(topo_type, topo)
-                                for child in blank_root:
-                                    if child.tag == xml_section[topo_type]:
-                                        child.append(elem)
+                        # compare position by position in the class/type mix
+                        # this entry uses, bailing out on the first mismatch
+                        # rather than materializing a probe tuple per attempt
+                        for want, i, uc in zip(required, sequence, use_class):
+                            got = element_classes[i] if uc else topo_element[i]
+                            if got != want:
+                                break
+                        else:
+                            collection_key = _intern(_canonical(required, seqs))
+                            if collection_key not in unique_collection:
+                                unique_collection.add(collection_key)
+                                matched_elems.append(_dict_to_xml(topo_type, topo))
                             not_matched = False
-                            
+
+        return matched_elems
+
+    return _matcher
+
+# one specialized matcher per topology kind, built once at import time
+_MATCHERS = {topo_type: _make_matcher(topo_type, n_params)
+             for topo_type, n_params in _TOPO_TYPES}
+
 def forcefield_trim(typed_molecule, input_xml, output_xml):
 
     # Read in an empty Foyer xml file with all the expected elements
     path_to_blank_xml  = resource_filename("foyer_xml_trimmer", "data/blank.xml")
     blank_tree = ET.parse(path_to_blank_xml)
     blank_root = blank_tree.getroot()
-    
+
+    # index the output sections by tag so every append below is a dict
+    # lookup rather than a scan over the blank file's children
+    blank_children = {child.tag: child for child in blank_root}
+
     # Read in the untrimmed foyer XML file
     xml_tree = ET.parse(input_xml)
     xml_root = xml_tree.getroot()
-       
+
+    # index the Type and Atom entries by name/type once, so lookups below
+    # are O(1) dict accesses instead of full rescans of the element tree.
+    # findall filters by tag inside the parser's native code rather than
+    # testing every element at the python level.
+    xml_type_by_name = {atom.attrib['name']: atom for atom in xml_root.findall('.//Type')}
+    xml_atoms_by_type = {atom.attrib['type']: atom for atom in xml_root.findall('.//Atom')}
+
     # we need to check to ensure that the typed_molecule
     # is in fact a parmed structure object, otherwise
     # raise an error
@@ -184,69 +411,62 @@ def forcefield_trim(typed_molecule, input_xml, output_xml):
         for atom in typed_molecule.atoms:
             if atom.atom_type.name not in atom_type_dict:
                 atom_type_dict[atom.atom_type.name] = ''
-        
-        #loop over each atom_type to set class and find if there are any overrides we need to define
-        iterate = True
-        while iterate:
-            atom_type_overrides_dict = {}
-            for atom_type in atom_type_dict:
-                #loop over the Type definitions in the xml file
-                for atom in xml_root.iter('Type'):
-                    #find the matching atom_type
-                    if atom.attrib['name'] == atom_type:
-                        #associated the atom-class with atom-type
-                        atom_type_dict[atom_type] = atom.attrib['class']
-                        if 'overrides' in atom.attrib:
-                            overrides = atom.attrib['overrides']
-                            overrides = overrides.split(',')
-                            for override in overrides:
-                                if override not in atom_type_dict:
-                                    atom_type_overrides_dict[override] = ''
-            atom_type_dict.update(atom_type_overrides_dict)
-        
-            if len(atom_type_overrides_dict) > 0:
-                for key in atom_type_overrides_dict:
-                    print('Note: atom type: ', key, ' is referenced in an overrides statement, but does not appear in the system.')
-            else:
-                iterate = False
-                
+
+        #set the class for each atom_type and find if there are any overrides we need to define
+        _resolve_overrides(atom_type_dict, {name: atom.attrib for name, atom in xml_type_by_name.items()})
+
         # first we will loop over the AtomTypes
-        for atom in xml_root.iter('Type'):
-            if atom.attrib['name'] in atom_type_dict:
-                atom_type_dict[atom.attrib['name']] = atom.attrib['class']
+        for atom_name, atom in xml_type_by_name.items():
+            if atom_name in atom_type_dict:
+                atom_type_dict[atom_name] = atom.attrib['class']
                 elem = _dict_to_xml('Type', atom.attrib)
-                
+
                 #populate the blank XML file
-                for child in blank_root:
-                    if child.tag == 'AtomTypes':
-                        child.append(elem)
-            
+                blank_children['AtomTypes'].append(elem)
+
         # next, loop over the NonBondedForce section
-        for atom in xml_root.iter('Atom'):
-            if atom.attrib['type'] in atom_type_dict:
+        for atom_type, atom in xml_atoms_by_type.items():
+            if atom_type in atom_type_dict:
                 elem = _dict_to_xml('Atom', atom.attrib)
-                
+
                 #populate the blank XML file
-                for child in blank_root:
-                    if child.tag == 'NonbondedForce':
-                        child.append(elem)
+                blank_children['NonbondedForce'].append(elem)
         
-        _topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Bond', n_params=2)
-        _topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Angle', n_params=3)
-        _topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Proper', n_params=4)
-        _topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Improper', n_params=4)
+        # walk the parmed topology once per kind up front; _topology_match
+        # then works from these collections without re-traversing the structure
+        unique_topos = {topo_type: _collect_unique_topology(typed_molecule, topo_type, n_params)
+                        for topo_type, n_params in _TOPO_TYPES}
+
+        # the four topology kinds are independent of one another, so match
+        # them in parallel threads; under lxml much of the element work runs
+        # in C code that releases the GIL. The results are merged into the
+        # output tree in the main thread, in the fixed _TOPO_TYPES order so
+        # the output stays deterministic.
+        with ThreadPoolExecutor(max_workers=len(_TOPO_TYPES)) as executor:
+            futures = {topo_type: executor.submit(_MATCHERS[topo_type], atom_type_dict=atom_type_dict,
+                                                  unique_topos=unique_topos[topo_type],
+                                                  xml_root=xml_root)
+                       for topo_type, n_params in _TOPO_TYPES}
+
+        for topo_type, n_params in _TOPO_TYPES:
+            blank_children[_XML_SECTION[topo_type]].extend(futures[topo_type].result())
  
-        ET.indent(blank_root, space='\t', level=0)
-        blank_tree.write(output_xml, encoding="utf-8", xml_declaration=True)
+        _write_forcefield(blank_tree, output_xml)
 
 
 def forcefield_score(typed_molecule, input_xml):
 
     
-    # Read in the untrimmed foyer XML file
-    xml_tree = ET.parse(input_xml)
-    xml_root = xml_tree.getroot()
-       
+    # We only need the attributes of the Type entries here, and we never
+    # mutate the tree, so stream the untrimmed foyer XML file with iterparse
+    # and clear each element once processed. This keeps peak memory at
+    # O(one element) rather than holding the fully parsed tree.
+    xml_type_by_name = {}
+    for event, elem in ET.iterparse(input_xml, events=('end',)):
+        if elem.tag == 'Type':
+            xml_type_by_name[elem.attrib['name']] = dict(elem.attrib)
+        elem.clear()
+
     # we need to check to ensure that the typed_molecule
     # is in fact a parmed structure object, otherwise
     # raise an error
@@ -267,46 +487,25 @@ def forcefield_score(typed_molecule, input_xml):
             if atom.atom_type.name not in atom_type_dict:
                 atom_type_dict[atom.atom_type.name] = ''
         
-        #loop over each atom_type to set class and find if there are any overrides we need to define
-        iterate = True
-        while iterate:
-            atom_type_overrides_dict = {}
-            for atom_type in atom_type_dict:
-                #loop over the Type definitions in the xml file
-                for atom in xml_root.iter('Type'):
-                    #find the matching atom_type
-                    if atom.attrib['name'] == atom_type:
-                        #associated the atom-class with atom-type
-                        atom_type_dict[atom_type] = atom.attrib['class']
-                        if 'overrides' in atom.attrib:
-                            overrides = atom.attrib['overrides']
-                            overrides = overrides.split(',')
-                            for override in overrides:
-                                if override not in atom_type_dict:
-                                    atom_type_overrides_dict[override] = ''
-            atom_type_dict.update(atom_type_overrides_dict)
-        
-            if len(atom_type_overrides_dict) > 0:
-                for key in atom_type_overrides_dict:
-                    print('Note: atom type: ', key, ' is referenced in an overrides statement, but does not appear in the system.')
-            else:
-                iterate = False
+        #set the class for each atom_type and find if there are any overrides we need to define
+        _resolve_overrides(atom_type_dict, xml_type_by_name)
+
         xml_atom_type_dict = {}
         xml_atom_type_dict_score = {}
         # first we will loop over the AtomTypes
-        for atom in xml_root.iter('Type'):
-            xml_atom_type_dict[atom.attrib['name']] = atom.attrib['class']
-            xml_atom_type_dict_score[atom.attrib['name']] = 0
+        for atom_name, atom_attrib in xml_type_by_name.items():
+            xml_atom_type_dict[atom_name] = atom_attrib['class']
+            xml_atom_type_dict_score[atom_name] = 0
             
         for atom in xml_atom_type_dict:
             if atom in atom_type_dict:
-                xml_atom_type_dict_score
-                
+                xml_atom_type_dict_score[atom] += 1
+
         
-        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Bond', n_params=2)
-        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Angle', n_params=3)
-        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Proper', n_params=4)
-        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_root=blank_root, topo_type='Improper', n_params=4)
+        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_children=blank_children, topo_type='Bond', n_params=2)
+        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_children=blank_children, topo_type='Angle', n_params=3)
+        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_children=blank_children, topo_type='Proper', n_params=4)
+        #_topology_match(atom_type_dict=atom_type_dict, typed_topo=typed_molecule, xml_root=xml_root, blank_children=blank_children, topo_type='Improper', n_params=4)
  
 
 
@@ -13,3 +13,23 @@ import foyer_xml_trimmer
 def test_foyer_xml_trimmer_imported():
     """Sample test, will always pass so long as import statement worked."""
     assert "foyer_xml_trimmer" in sys.modules
+
+
+def test_write_forcefield_without_lxml(tmp_path, monkeypatch):
+    """Regression test: the stdlib fallback in _write_forcefield must write
+    the tree itself rather than recursing back into the function."""
+    from foyer_xml_trimmer import foyer_xml_trimmer as fxt
+
+    root = fxt.Element('ForceField')
+    section = fxt.Element('AtomTypes')
+    section.append(fxt.Element('Type', attrib={'name': 'opls_135', 'class': 'CT'}))
+    root.append(section)
+    tree = fxt.ElementTree(root)
+    output_xml = str(tmp_path / 'trimmed.xml')
+
+    monkeypatch.setattr(fxt, '_HAVE_LXML', False)
+    fxt._write_forcefield(tree, output_xml)
+
+    written = fxt.ET.parse(output_xml).getroot()
+    assert written.tag == 'ForceField'
+    assert written.find('.//Type').attrib['name'] == 'opls_135'